@@ -0,0 +1,32 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.validators import ValidationError
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+
+
+class RecipeImageField(Base64ImageField):
+
+    def to_internal_value(self, base64_data):
+        if isinstance(base64_data, str) and (
+            len(base64_data) * 3 // 4 > settings.MAX_IMAGE_SIZE
+        ):
+            raise ValidationError(
+                'Размер изображения не может превышать '
+                f'{settings.MAX_IMAGE_SIZE // (1024 * 1024)} МБ'
+            )
+        return super().to_internal_value(base64_data)
+
+    def get_file_extension(self, filename, decoded_file):
+        extension = super().get_file_extension(filename, decoded_file)
+        try:
+            with Image.open(BytesIO(decoded_file)) as image:
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            raise ValidationError(
+                'Разрешение изображения слишком велико'
+            )
+        return extension
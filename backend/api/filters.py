@@ -1,6 +1,13 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
+from recipes.tag_index import tag_index
+
+
+def get_tag_choices():
+    return tag_index.get_slugs()
 
 
 class IngredientFilter(filters.FilterSet):
@@ -13,6 +20,17 @@ class IngredientFilter(filters.FilterSet):
         model = Ingredient
 
 
+class StableOrderingFilter(filters.OrderingFilter):
+    """Добавляет -id, чтобы страницы не теряли и не повторяли записи."""
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.order_by(
+            *[self.get_ordering_value(param) for param in value], '-id'
+        )
+
+
 class RecipeFilter(filters.FilterSet):
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
@@ -20,20 +38,46 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='get_tags',
+    )
+    search = filters.CharFilter(method='get_search')
+    ordering = StableOrderingFilter(
+        fields=(
+            ('pub_date', 'pub_date'),
+            ('favorites_count', 'popularity'),
+        ),
+    )
 
     class Meta:
         fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart', )
         model = Recipe
 
+    def get_tags(self, queryset, name, value):
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef('pk'),
+                    tag_id__in=tag_index.get_ids(value),
+                )
+            )
+        )
+
+    def get_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
+
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(fav_recipes__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(shopping_cart__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
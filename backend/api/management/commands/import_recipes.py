@@ -0,0 +1,56 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.recipe_import import RecipeImporter
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Импортирует рецепты из файла JSON Lines (один рецепт в строке)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--author', required=True, help='email автора рецептов'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_BATCH_SIZE
+        )
+
+    def read(self, file):
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                self.stderr.write(
+                    f'Строка {number}: некорректный JSON: {error}'
+                )
+                yield None
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(email=options['author']).first()
+        if author is None:
+            raise CommandError(f'Автор не найден: {options["author"]}')
+        importer = RecipeImporter(author, batch_size=options['batch_size'])
+        started = time.perf_counter()
+        created = failed = 0
+        with open(options['path'], encoding='utf-8') as file:
+            for result in importer.run(self.read(file)):
+                if 'id' in result:
+                    created += 1
+                    continue
+                failed += 1
+                self.stderr.write(
+                    f'Рецепт #{result["index"]}: '
+                    f'{json.dumps(result["errors"], ensure_ascii=False)}'
+                )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано: {created}, с ошибками: {failed}, '
+            f'{elapsed:.2f} с'
+        ))
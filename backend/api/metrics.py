@@ -0,0 +1,200 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (1 << 10, 1 << 12, 1 << 14, 1 << 16, 1 << 18, 1 << 20)
+
+current_stats = ContextVar('request_stats', default=None)
+
+
+def format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def observe(self, labels, value=1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, format_labels(self.labels, labels), value
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels, buckets):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, labels, value=1):
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [[0] * len(self.buckets), 0, 0]
+        position = bisect_left(self.buckets, value)
+        if position < len(self.buckets):
+            counts[0][position] += 1
+        counts[1] += 1
+        counts[2] += value
+
+    def samples(self):
+        for labels, (buckets, count, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, buckets):
+                cumulative += hits
+                yield (
+                    f'{self.name}_bucket',
+                    format_labels(self.labels, labels, le=bound),
+                    cumulative,
+                )
+            yield (
+                f'{self.name}_bucket',
+                format_labels(self.labels, labels, le='+Inf'),
+                count,
+            )
+            plain = format_labels(self.labels, labels)
+            yield f'{self.name}_count', plain, count
+            yield f'{self.name}_sum', plain, total
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = Lock()
+        route = ('route', 'method')
+        self.requests = Counter(
+            'foodgram_http_requests_total',
+            'Обработанные запросы', route + ('status',),
+        )
+        self.latency = Histogram(
+            'foodgram_http_request_duration_seconds',
+            'Время обработки запроса', route, LATENCY_BUCKETS,
+        )
+        self.queries = Histogram(
+            'foodgram_db_queries_per_request',
+            'SQL-запросов на запрос', route, QUERY_BUCKETS,
+        )
+        self.sql_time = Counter(
+            'foodgram_db_query_duration_seconds_total',
+            'Суммарное время SQL-запросов', route,
+        )
+        self.response_size = Histogram(
+            'foodgram_http_response_size_bytes',
+            'Размер ответа', route, SIZE_BUCKETS,
+        )
+        self.metrics = (
+            self.requests, self.latency, self.queries, self.sql_time,
+            self.response_size,
+        )
+
+    def record(self, request, response, stats):
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        labels = (route, request.method)
+        elapsed = perf_counter() - stats.started
+        size = None
+        if not response.streaming:
+            size = len(response.content)
+        with self.lock:
+            self.requests.observe(labels + (response.status_code,))
+            self.latency.observe(labels, elapsed)
+            self.queries.observe(labels, stats.queries)
+            self.sql_time.observe(labels, stats.sql_time)
+            if size is not None:
+                self.response_size.observe(labels, size)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(
+                    f'{name}{labels} {value}'
+                    for name, labels, value in metric.samples()
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.sql_time += perf_counter() - started
+
+
+def install_query_recorder(connection, **kwargs):
+    # В начало списка: connection.execute_wrapper() снимает последний
+    # элемент, и соединение может открыться внутри такого блока.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        registry.record(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        registry.record(request, response, stats)
+        return response
@@ -0,0 +1,107 @@
+from hashlib import md5
+
+from django.core.cache import caches
+from django.db import connection
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from foodgram.query_budget import QueryCounter, check_query_budget
+from recipes.versions import get_versions
+
+PAGINATION_PARAMS = (
+    'page_query_param', 'cursor_query_param', 'mode_query_param'
+)
+
+
+class QueryBudgetMixin:
+    query_budget = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+        self.check_query_budget(counter.count)
+        return response
+
+    def check_query_budget(self, count):
+        action = getattr(self, 'action', None)
+        check_query_budget(
+            f'{self.__class__.__name__}.{action}',
+            count,
+            self.query_budget.get(action),
+        )
+
+
+class ConditionalGetMixin:
+    etag_versions = ()
+    etag_per_user = False
+
+    def get_etag_parts(self, request):
+        names = list(self.etag_versions)
+        if self.etag_per_user and request.user.is_authenticated:
+            names.append(f'viewer:{request.user.id}')
+        return get_versions(*names)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        parts = self.get_etag_parts(request)
+        etag = None
+        if parts is not None:
+            etag = quote_etag(
+                md5(':'.join(map(str, parts)).encode()).hexdigest()
+            )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag:
+                response.headers['ETag'] = etag
+            if self.etag_per_user:
+                patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class PageCacheMixin:
+    page_cache_versions = ()
+
+    def get_page_stamp(self, request):
+        return ''
+
+    def get_page_cache_key(self, request):
+        params = sorted(set(self.filterset_class.base_filters) | {
+            getattr(self.paginator, name)
+            for name in PAGINATION_PARAMS if hasattr(self.paginator, name)
+        })
+        parts = get_versions(*self.page_cache_versions)
+        parts.append(request.get_host())
+        for name in params:
+            values = sorted(set(request.query_params.getlist(name)))
+            if name == self.paginator.page_query_param and not values:
+                values = ['1']
+            parts.append(f'{name}={",".join(values)}')
+        parts.append(self.get_page_stamp(request))
+        digest = md5(':'.join(parts).encode()).hexdigest()
+        return f'{self.basename}:list:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        cache = caches['pages']
+        key = self.get_page_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
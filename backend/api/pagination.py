@@ -0,0 +1,64 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+
+
+class FeedCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+
+class SwitchablePagination(BasePagination):
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    page_query_param = PageNumberPagination.page_query_param
+    cursor_query_param = FeedCursorPagination.cursor_query_param
+    cursor_conflicts = ('search', 'ordering')
+
+    def __init__(self):
+        self.paginator = PageNumberPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == (
+            self.cursor_mode
+        ):
+            conflicts = [
+                name for name in self.cursor_conflicts
+                if request.query_params.get(name)
+            ]
+            if conflicts:
+                raise ValidationError({
+                    self.mode_query_param:
+                        'Курсорная пагинация несовместима с параметрами: '
+                        + ', '.join(conflicts)
+                })
+            self.paginator = FeedCursorPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_page_rows(self, queryset, request, view=None):
+        """Записи запрошенной страницы без COUNT-запроса."""
+        number = request.query_params.get(self.page_query_param, '1')
+        if request.query_params.get(self.mode_query_param) == (
+            self.cursor_mode
+        ) or not number.isdigit() or int(number) < 1:
+            return self.paginate_queryset(queryset, request, view)
+        page_size = self.paginator.get_page_size(request)
+        offset = (int(number) - 1) * page_size
+        return list(queryset[offset:offset + page_size])
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return self.paginator.get_schema_operation_parameters(view)
@@ -0,0 +1,129 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from recipes.counters import adjust_counter
+from recipes.feed import fan_out
+from recipes.images import schedule_variants
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.search import update_search_vector
+from recipes.versions import bump_version
+from .serializers import RecipeImportSerializer
+
+RELATED_FIELDS = ('ingredients', 'tags')
+
+
+def collect_ids(items):
+    ingredient_ids, tag_ids = set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for ingredient in item.get('ingredients') or ():
+            if isinstance(ingredient, dict):
+                ingredient_ids.add(ingredient.get('id'))
+        if isinstance(item.get('tags'), list):
+            tag_ids.update(item['tags'])
+    return (
+        {pk for pk in ingredient_ids if isinstance(pk, int)},
+        {pk for pk in tag_ids if isinstance(pk, int)},
+    )
+
+
+class RecipeImporter:
+
+    def __init__(self, author, batch_size=settings.BULK_BATCH_SIZE):
+        self.author = author
+        self.batch_size = batch_size
+
+    def run(self, items):
+        items = iter(items)
+        offset = 0
+        while True:
+            chunk = list(islice(items, self.batch_size))
+            if not chunk:
+                return
+            yield from self.import_chunk(chunk, offset)
+            offset += len(chunk)
+
+    def validate(self, items, offset):
+        ingredient_ids, tag_ids = collect_ids(items)
+        context = {
+            'ingredient_ids': set(
+                Ingredient.objects.filter(
+                    id__in=ingredient_ids
+                ).values_list('id', flat=True)
+            ),
+            'tag_ids': set(
+                Tag.objects.filter(id__in=tag_ids).values_list('id', flat=True)
+            ),
+        }
+        valid, invalid = [], []
+        for index, item in enumerate(items, offset):
+            serializer = RecipeImportSerializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                invalid.append({'index': index, 'errors': serializer.errors})
+        return valid, invalid
+
+    def save(self, valid):
+        bump_version('recipe', 'pantry')
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=self.author,
+                **{
+                    field: value for field, value in data.items()
+                    if field not in RELATED_FIELDS
+                }
+            )
+            for _, data in valid
+        )
+        adjust_counter(Recipe, [self.author.id] * len(recipes), 1)
+        fan_out(recipes)
+        update_search_vector(
+            Recipe.objects.filter(pk__in=[recipe.id for recipe in recipes])
+        )
+        IngredientRecipe.objects.bulk_create(
+            (
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient_id=ingredient['id'],
+                    amount=ingredient['amount'],
+                )
+                for recipe, (_, data) in zip(recipes, valid)
+                for ingredient in data['ingredients']
+            ),
+            batch_size=self.batch_size,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag)
+                for recipe, (_, data) in zip(recipes, valid)
+                for tag in data['tags']
+            ),
+            batch_size=self.batch_size,
+        )
+        return recipes
+
+    def import_chunk(self, items, offset=0):
+        valid, results = self.validate(items, offset)
+        if valid:
+            try:
+                with transaction.atomic():
+                    recipes = self.save(valid)
+                    for recipe in recipes:
+                        schedule_variants(recipe)
+            except DatabaseError as error:
+                results.extend(
+                    {'index': index, 'errors': {'non_field_errors': [
+                        f'Ошибка сохранения: {error}'
+                    ]}}
+                    for index, _ in valid
+                )
+            else:
+                results.extend(
+                    {'index': index, 'id': recipe.id}
+                    for (index, _), recipe in zip(valid, recipes)
+                )
+        return sorted(results, key=lambda result: result['index'])
@@ -1,12 +1,17 @@
 from django.conf import settings
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     ValidationError)
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from recipes.images import get_variant_urls, schedule_variants
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
-                            Recipe, ShoppingCart, Tag)
+                            Recipe, ShoppingCart, ShoppingListItem,
+                            SimilarRecipe, Tag)
+from recipes.versions import bump_version
 from users.models import Subscribe, User
+from .fields import RecipeImageField
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -24,6 +29,8 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
@@ -45,9 +52,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class IngredientRecipeWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         validators=(
             MinValueValidator(
@@ -98,6 +103,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'ingredients',
             'is_favorited',
             'is_in_shopping_cart',
+            'favorites_count',
             'name',
             'image',
             'text',
@@ -107,6 +113,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         model = Recipe
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
@@ -115,6 +123,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
@@ -123,13 +133,22 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         ).exists()
 
 
+class PantryRecipeSerializer(RecipeReadSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ('coverage', 'missing', )
+        read_only_fields = fields
+
+
 class RecipeWriteSerializer(serializers.ModelSerializer):
     ingredients = IngredientRecipeWriteSerializer(many=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True
     )
     author = UserSerializer(read_only=True)
-    image = Base64ImageField(required=False)
+    image = RecipeImageField(required=False)
 
     class Meta:
         model = Recipe
@@ -144,43 +163,87 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
 
     def validate_ingredients(self, value):
-        if value:
-            ingredients_list = []
-            for ingredient in value:
-                if ingredient['id'] in ingredients_list:
-                    raise ValidationError(
-                        'Ингредиенты не уникальны'
-                    )
-                ingredients_list.append(ingredient['id'])
-        else:
+        if not value:
             raise ValidationError(
                 'Ингредиенты отсутствуют'
             )
+        ingredient_ids = {ingredient['id'] for ingredient in value}
+        if len(ingredient_ids) != len(value):
+            raise ValidationError(
+                'Ингредиенты не уникальны'
+            )
+        missing = ingredient_ids - self.get_existing_ingredients(
+            ingredient_ids
+        )
+        if missing:
+            raise ValidationError(
+                'Ингредиенты не найдены: '
+                + ', '.join(map(str, sorted(missing)))
+            )
         return value
 
+    def get_existing_ingredients(self, ingredient_ids):
+        return set(
+            Ingredient.objects.filter(
+                id__in=ingredient_ids
+            ).values_list('id', flat=True)
+        )
+
     def validate_tags(self, value):
-        if value:
-            tags_list = []
-            for tag in value:
-                if tag in tags_list:
-                    raise ValidationError(
-                        'Теги не уникальны'
-                    )
-                tags_list.append(tag)
-        else:
+        if not value:
             raise ValidationError(
                 'Теги отсутствуют'
             )
+        if len(set(value)) != len(value):
+            raise ValidationError(
+                'Теги не уникальны'
+            )
         return value
 
     def connect_ingredient(self, recipe, ingredients):
-        for ingredient in ingredients:
-            IngredientRecipe.objects.create(
-                ingredient=ingredient['id'],
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount'],
                 recipe=recipe
             )
-
+            for ingredient in ingredients
+        )
+        bump_version('pantry')
+
+    def sync_ingredients(self, recipe, ingredients):
+        current = {
+            ingredient_recipe.ingredient_id: ingredient_recipe
+            for ingredient_recipe in recipe.ingredient_recipes.all()
+        }
+        wanted = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = current.keys() - wanted.keys()
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, ingredient_recipe in current.items():
+            amount = wanted.get(ingredient_id)
+            if amount is not None and ingredient_recipe.amount != amount:
+                ingredient_recipe.amount = amount
+                changed.append(ingredient_recipe)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        added = [
+            ingredient for ingredient in ingredients
+            if ingredient['id'] not in current
+        ]
+        if added:
+            self.connect_ingredient(recipe=recipe, ingredients=added)
+        return removed | {
+            ingredient_recipe.ingredient_id for ingredient_recipe in changed
+        } | {ingredient['id'] for ingredient in added}
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -192,35 +255,87 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         self.connect_ingredient(
             recipe=recipe, ingredients=ingredients,
         )
+        schedule_variants(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if 'image' in validated_data:
+            validated_data['image_variants'] = {}
         super().update(instance, validated_data)
-        instance.ingredients.clear()
-        instance.tags.set(tags)
-        self.connect_ingredient(
-            recipe=instance, ingredients=ingredients
-        )
-        instance.save()
+        if 'image' in validated_data:
+            schedule_variants(instance)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            changed_ingredients = self.sync_ingredients(
+                recipe=instance, ingredients=ingredients
+            )
+            if changed_ingredients:
+                ShoppingListItem.objects.refresh(
+                    users=instance.shopping_cart.values('user'),
+                    ingredients=changed_ingredients,
+                )
         return instance
 
     def to_representation(self, instance):
+        user = self.context['request'].user
+        instance = Recipe.objects.with_related(user).with_user_flags(
+            user
+        ).get(pk=instance.pk)
         return RecipeReadSerializer(instance, context=self.context).data
 
 
+class RecipeImportSerializer(RecipeWriteSerializer):
+    tags = serializers.ListField(child=serializers.IntegerField())
+
+    def get_existing_ingredients(self, ingredient_ids):
+        return self.context['ingredient_ids']
+
+    def validate_tags(self, value):
+        value = super().validate_tags(value)
+        missing = set(value) - self.context['tag_ids']
+        if missing:
+            raise ValidationError(
+                'Теги не найдены: ' + ', '.join(map(str, sorted(missing)))
+            )
+        return value
+
+
 class RecipeSubscriberSerializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time',)
         read_only_fields = fields
         model = Recipe
 
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj, self.context.get('request'))
+
+
+class SimilarRecipeSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='similar.id')
+    name = serializers.ReadOnlyField(source='similar.name')
+    image = serializers.ImageField(source='similar.image', read_only=True)
+    image_variants = serializers.SerializerMethodField()
+    cooking_time = serializers.ReadOnlyField(source='similar.cooking_time')
+
+    class Meta:
+        fields = (
+            'id', 'name', 'image', 'image_variants', 'cooking_time', 'score',
+        )
+        model = SimilarRecipe
+
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj.similar, self.context.get('request'))
+
 
 class SubscribeSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         fields = (
@@ -235,10 +350,9 @@ class SubscribeSerializer(serializers.ModelSerializer):
         )
         model = User
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
@@ -248,6 +362,10 @@ class SubscribeSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'limited_recipes'):
+            return RecipeSubscriberSerializer(
+                obj.limited_recipes, many=True
+            ).data
         recipe = obj.recipes.all()
         limit = request.GET.get('recipes_limit')
         if limit:
@@ -259,19 +377,35 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='recipe.id')
     name = serializers.ReadOnlyField(source='recipe.name')
     image = serializers.ImageField(source='recipe.image', read_only=True)
+    image_variants = serializers.SerializerMethodField()
     cooking_time = serializers.ReadOnlyField(source='recipe.cooking_time')
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time',)
         model = FavoriteRecipe
 
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj.recipe, self.context.get('request'))
+
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='recipe.id')
     name = serializers.ReadOnlyField(source='recipe.name')
     image = serializers.ImageField(source='recipe.image', read_only=True)
+    image_variants = serializers.SerializerMethodField()
     cooking_time = serializers.ReadOnlyField(source='recipe.cooking_time')
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time',)
         model = ShoppingCart
+
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj.recipe, self.context.get('request'))
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_SIZE,
+    )
@@ -0,0 +1,83 @@
+import csv
+import json
+
+from django.db.models import F
+
+from recipes.models import ShoppingListItem
+
+FORMATS = {
+    'txt': ('text/plain', 'shopping_list.txt'),
+    'csv': ('text/csv', 'shopping_list.csv'),
+    'json': ('application/x-ndjson', 'shopping_list.jsonl'),
+}
+CHUNK_SIZE = 2000
+
+
+def get_ingredient_totals(user):
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name', 'ingredient__measurement_unit',
+        total=F('amount'),
+    ).order_by('ingredient__name')
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+CSV_WRITER = csv.writer(Echo())
+
+
+def render_txt(item):
+    return (
+        f'{item["ingredient__name"]} - {item["total"]} '
+        f'{item["ingredient__measurement_unit"]}'
+    )
+
+
+def render_csv(item):
+    return CSV_WRITER.writerow((
+        item['ingredient__name'],
+        item['total'],
+        item['ingredient__measurement_unit'],
+    ))
+
+
+def render_json(item):
+    return json.dumps({
+        'name': item['ingredient__name'],
+        'amount': item['total'],
+        'measurement_unit': item['ingredient__measurement_unit'],
+    }, ensure_ascii=False) + '\n'
+
+
+# формат: (заголовок, строка позиции, разделитель между позициями)
+RENDERERS = {
+    'txt': ('', render_txt, '\n'),
+    'csv': (
+        CSV_WRITER.writerow(('name', 'amount', 'measurement_unit')),
+        render_csv,
+        '',
+    ),
+    'json': ('', render_json, ''),
+}
+
+
+def stream_shopping_list(totals, file_format):
+    header, render, separator = RENDERERS[file_format]
+    if header:
+        yield header
+    for index, item in enumerate(totals.iterator(chunk_size=CHUNK_SIZE)):
+        yield (separator if index else '') + render(item)
+
+
+async def astream_shopping_list(totals, file_format):
+    """Для ASGI: строки читаются из БД порциями через sync_to_async."""
+    header, render, separator = RENDERERS[file_format]
+    if header:
+        yield header
+    index = 0
+    async for item in totals.aiterator(chunk_size=CHUNK_SIZE):
+        yield (separator if index else '') + render(item)
+        index += 1
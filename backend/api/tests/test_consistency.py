@@ -0,0 +1,136 @@
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.counters import counter_drift
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, ShoppingListItem, Tag)
+from users.models import User
+
+
+class DenormalizedStateTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            password='password', first_name='author', last_name='author',
+            is_staff=True,
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            password='password', first_name='reader', last_name='reader',
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#ff0000', slug='breakfast'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(4)
+        ]
+        cls.recipes = []
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {index}', text='Текст',
+                image='recipes/img/recipe.png', cooking_time=10,
+            )
+            recipe.tags.set([cls.tag])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=10 * (index + 1))
+                for ingredient in cls.ingredients[index:index + 2]
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.clients = {}
+        for user in (self.author, self.reader):
+            token, _ = Token.objects.get_or_create(user=user)
+            self.clients[user] = self.client_class()
+            self.clients[user].credentials(
+                HTTP_AUTHORIZATION=f'Token {token.key}'
+            )
+
+    def assertConsistent(self):
+        self.assertEqual(ShoppingListItem.objects.inconsistencies(), [])
+        self.assertEqual(counter_drift(), [])
+
+    def test_toggles(self):
+        client = self.clients[self.reader]
+        for name in ('recipes-favorite', 'recipes-shopping_cart'):
+            for recipe in self.recipes:
+                response = client.post(reverse(name, args=(recipe.id,)))
+                self.assertEqual(response.status_code, 201)
+                self.assertConsistent()
+            response = client.delete(
+                reverse(name, args=(self.recipes[0].id,))
+            )
+            self.assertEqual(response.status_code, 204)
+            self.assertConsistent()
+        self.assertEqual(ShoppingCart.objects.count(), 2)
+        self.assertEqual(FavoriteRecipe.objects.count(), 2)
+
+    def test_bulk_toggles(self):
+        client = self.clients[self.reader]
+        ids = [recipe.id for recipe in self.recipes]
+        for name in ('recipes-bulk_favorite', 'recipes-bulk_shopping_cart'):
+            url = reverse(name)
+            response = client.post(url, {'recipes': ids[:2]}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertConsistent()
+            response = client.post(url, {'recipes': ids}, format='json')
+            self.assertEqual(response.status_code, 207)
+            self.assertConsistent()
+            response = client.delete(
+                url, {'recipes': ids[1:]}, format='json'
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertConsistent()
+
+    def test_patch_ingredients_of_carted_recipe(self):
+        recipe = self.recipes[0]
+        for user in (self.author, self.reader):
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        FavoriteRecipe.objects.create(user=self.reader, recipe=recipe)
+        response = self.clients[self.author].patch(
+            reverse('recipes-detail', args=(recipe.id,)),
+            {
+                'ingredients': [
+                    {'id': self.ingredients[1].id, 'amount': 7},
+                    {'id': self.ingredients[3].id, 'amount': 9},
+                ],
+                'tags': [self.tag.id],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+        response = self.clients[self.author].delete(
+            reverse('recipes-detail', args=(recipe.id,))
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertConsistent()
+
+    def test_import(self):
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipes[0])
+        items = [
+            {
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 5}
+                    for ingredient in self.ingredients[:index + 1]
+                ],
+                'tags': [self.tag.id],
+                'name': f'Импорт {index}',
+                'text': 'Текст',
+                'cooking_time': 5,
+            }
+            for index in range(3)
+        ]
+        response = self.clients[self.author].post(
+            reverse('recipes-import'), items, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertConsistent()
@@ -0,0 +1,121 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, Tag)
+from users.models import Subscribe, User
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('reader')
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {index}', color=f'#00000{index}',
+                slug=f'tag-{index}',
+            )
+            for index in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(6)
+        ]
+
+    def setUp(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            password='password', first_name=username, last_name=username,
+        )
+
+    def create_recipes(self, author, count, size=1):
+        recipes = []
+        for index in range(count):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {index}', text='Текст',
+                image='recipes/img/recipe.png', cooking_time=10,
+            )
+            recipe.tags.set(self.tags[:size])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=10)
+                for ingredient in self.ingredients[:size]
+            )
+            FavoriteRecipe.objects.create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            recipes.append(recipe)
+        return recipes
+
+    def count_queries(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertQueriesConstant(self, url, grow):
+        queries = self.count_queries(url)
+        grow()
+        self.assertEqual(self.count_queries(url), queries)
+
+    def test_recipe_list(self):
+        author = self.create_user('author')
+        self.create_recipes(author, 1)
+        self.assertQueriesConstant(
+            reverse('recipes-list'),
+            lambda: self.create_recipes(author, 5, size=3),
+        )
+
+    def test_recipe_retrieve(self):
+        recipe, = self.create_recipes(self.create_user('author'), 1)
+
+        def grow():
+            recipe.tags.set(self.tags)
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=20)
+                for ingredient in self.ingredients[1:]
+            )
+
+        self.assertQueriesConstant(
+            reverse('recipes-detail', args=(recipe.id,)), grow
+        )
+
+    def test_subscriptions(self):
+        author = self.create_user('author')
+        self.create_recipes(author, 1)
+        Subscribe.objects.create(user=self.user, author=author)
+
+        def grow():
+            for index in range(5):
+                author = self.create_user(f'author{index}')
+                self.create_recipes(author, 3)
+                Subscribe.objects.create(user=self.user, author=author)
+
+        self.assertQueriesConstant(reverse('users-subscriptions'), grow)
+
+    def test_feed(self):
+        author = self.create_user('author')
+        Subscribe.objects.create(user=self.user, author=author)
+        self.create_recipes(author, 1)
+
+        def grow():
+            self.create_recipes(author, 2, size=3)
+            other = self.create_user('other')
+            Subscribe.objects.create(user=self.user, author=other)
+            self.create_recipes(other, 3, size=2)
+
+        self.assertQueriesConstant(reverse('recipes-feed'), grow)
@@ -0,0 +1,80 @@
+import json
+from unittest import skipUnless
+
+from django.conf import settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.urls import router
+from recipes.models import Recipe
+from users.models import User
+
+ACTIONS = {url.name: url.callback for url in router.urls}
+
+
+@skipUnless(settings.ASYNC_TOGGLES, 'асинхронные переключатели выключены')
+class ToggleParityTest(APITestCase):
+    maxDiff = None
+    url_names = ('recipes-favorite', 'recipes-shopping_cart')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password',
+            first_name='user', last_name='user',
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Текст',
+            image='recipes/img/recipe.png', cooking_time=10,
+        )
+
+    @staticmethod
+    def summary(response):
+        if hasattr(response, 'render'):
+            response.render()
+        return (
+            response.status_code,
+            json.loads(response.content) if response.content else None,
+            response.get('Allow'),
+            response.get('WWW-Authenticate'),
+            response.get('Vary'),
+        )
+
+    def sync_request(self, name, method, pk, authorization):
+        request = getattr(APIRequestFactory(), method)(
+            reverse(name, args=(pk,)), HTTP_AUTHORIZATION=authorization
+        )
+        return self.summary(ACTIONS[name](request, pk=pk))
+
+    def async_request(self, name, method, pk, authorization):
+        return self.summary(getattr(self.client, method)(
+            reverse(name, args=(pk,)), HTTP_AUTHORIZATION=authorization
+        ))
+
+    def run_scenario(self, request, name):
+        authorization = f'Token {self.token.key}'
+        missing = self.recipe.id + 1000
+        steps = (
+            ('post', self.recipe.id, authorization),
+            ('post', self.recipe.id, authorization),
+            ('delete', self.recipe.id, authorization),
+            ('delete', self.recipe.id, authorization),
+            ('post', missing, authorization),
+            ('delete', missing, authorization),
+            ('post', self.recipe.id, ''),
+            ('post', self.recipe.id, 'Token invalid'),
+            ('get', self.recipe.id, authorization),
+            ('put', self.recipe.id, authorization),
+            ('options', self.recipe.id, authorization),
+        )
+        return [request(name, *step) for step in steps]
+
+    def test_async_toggles_match_sync_actions(self):
+        for name in self.url_names:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.run_scenario(self.async_request, name),
+                    self.run_scenario(self.sync_request, name),
+                )
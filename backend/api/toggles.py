@@ -0,0 +1,198 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.renderers import JSONRenderer
+
+from recipes.counters import adjust_counter
+from recipes.models import (FavoriteRecipe, IngredientRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem)
+from recipes.versions import bump_version
+from .serializers import FavoriteRecipeSerializer, ShoppingCartSerializer
+
+TOGGLES = {
+    FavoriteRecipe: {
+        'url_name': 'favorite',
+        'serializer': FavoriteRecipeSerializer,
+        'exists': 'Вы уже добавили данный рецепт в избранное',
+        'missing': 'Данного рецепта нет в избранном',
+    },
+    ShoppingCart: {
+        'url_name': 'shopping_cart',
+        'serializer': ShoppingCartSerializer,
+        'exists': 'Вы уже добавили данный рецепт в список',
+        'missing': 'Данного рецепта нет в списке',
+    },
+}
+ALLOWED_METHODS = 'POST, DELETE, OPTIONS'
+
+
+def render(data=None, status_code=status.HTTP_200_OK, headers=None):
+    content = b'' if data is None else JSONRenderer().render(data)
+    response = HttpResponse(
+        content, status=status_code, content_type='application/json'
+    )
+    response.headers['Allow'] = ALLOWED_METHODS
+    patch_vary_headers(response, ('Accept',))
+    for header, value in (headers or {}).items():
+        response.headers[header] = value
+    return response
+
+
+def error(exc):
+    headers = {}
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        headers['WWW-Authenticate'] = TokenAuthentication.keyword
+    return render({'detail': exc.detail}, exc.status_code, headers)
+
+
+def on_toggled(model, user_id, recipe_ids):
+    bump_version(f'viewer:{user_id}')
+    if model is ShoppingCart:
+        ShoppingListItem.objects.refresh(
+            users=[user_id],
+            ingredients=IngredientRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values('ingredient'),
+        )
+
+
+def insert_links(model, user_id, recipe_ids):
+    """Добавляет связи пользователя с рецептами и возвращает id новых."""
+    inserted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), settings.BULK_BATCH_SIZE):
+            batch = recipe_ids[start:start + settings.BULK_BATCH_SIZE]
+            values = ', '.join(['(%s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {model._meta.db_table} (user_id, recipe_id) '
+                f'VALUES {values} ON CONFLICT DO NOTHING RETURNING recipe_id',
+                [param for pk in batch for param in (user_id, pk)],
+            )
+            inserted.extend(recipe_id for recipe_id, in cursor.fetchall())
+    return inserted
+
+
+def delete_links(model, user_id, recipe_ids):
+    """Удаляет связи пользователя с рецептами и возвращает id удалённых."""
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {model._meta.db_table} '
+            f'WHERE user_id = %s AND recipe_id IN ({placeholders}) '
+            'RETURNING recipe_id',
+            [user_id, *recipe_ids],
+        )
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def toggle(model, user_id, recipe_id, add):
+    write_links = insert_links if add else delete_links
+    with transaction.atomic():
+        changed = bool(write_links(model, user_id, [recipe_id]))
+        if changed:
+            adjust_counter(model, [recipe_id], 1 if add else -1)
+            on_toggled(model, user_id, [recipe_id])
+    return changed
+
+
+def bulk_toggle(model, user, recipe_ids, add):
+    options = TOGGLES[model]
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    linked = dict(
+        Recipe.objects.filter(id__in=recipe_ids).annotate(
+            linked=Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+        ).values_list('id', 'linked')
+    )
+    if add:
+        changed = [pk for pk in recipe_ids if linked.get(pk) is False]
+    else:
+        changed = [pk for pk in recipe_ids if linked.get(pk)]
+    if changed:
+        write_links = insert_links if add else delete_links
+        with transaction.atomic():
+            changed = write_links(model, user.id, changed)
+            if changed:
+                adjust_counter(model, changed, 1 if add else -1)
+                on_toggled(model, user.id, changed)
+    changed = set(changed)
+    results = []
+    for pk in recipe_ids:
+        if pk not in linked:
+            results.append({
+                'id': pk,
+                'status': status.HTTP_404_NOT_FOUND,
+                'errors': str(exceptions.NotFound.default_detail),
+            })
+        elif pk not in changed:
+            results.append({
+                'id': pk,
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': options['exists' if add else 'missing'],
+            })
+        else:
+            results.append({
+                'id': pk,
+                'status': (
+                    status.HTTP_201_CREATED if add
+                    else status.HTTP_204_NO_CONTENT
+                ),
+            })
+    return results
+
+
+def toggle_view(model, fallback):
+    """POST/DELETE без DRF; остальные методы (OPTIONS, 405) отдаёт fallback."""
+    options = TOGGLES[model]
+
+    async def view(request, pk):
+        if request.method not in ('POST', 'DELETE'):
+            return await sync_to_async(fallback)(request, pk=pk)
+        try:
+            credentials = await sync_to_async(
+                TokenAuthentication().authenticate
+            )(request)
+        except exceptions.AuthenticationFailed as exc:
+            return error(exc)
+        if credentials is None:
+            return error(exceptions.NotAuthenticated())
+        user = credentials[0]
+        if request.method == 'POST':
+            recipe = await Recipe.objects.only(
+                'id', 'name', 'image', 'image_variants', 'cooking_time'
+            ).filter(pk=pk).afirst()
+            if recipe is None:
+                return error(exceptions.NotFound())
+            try:
+                added = await sync_to_async(toggle)(
+                    model, user.id, recipe.id, add=True
+                )
+            except IntegrityError:
+                return error(exceptions.NotFound())
+            if not added:
+                return render(
+                    {'errors': options['exists']},
+                    status.HTTP_400_BAD_REQUEST,
+                )
+            serializer = options['serializer'](
+                model(user=user, recipe=recipe)
+            )
+            return render(serializer.data, status.HTTP_201_CREATED)
+        removed = await sync_to_async(toggle)(model, user.id, pk, add=False)
+        if removed:
+            return render(status_code=status.HTTP_204_NO_CONTENT)
+        if not await Recipe.objects.filter(pk=pk).aexists():
+            return error(exceptions.NotFound())
+        return render(
+            {'errors': options['missing']}, status.HTTP_400_BAD_REQUEST
+        )
+
+    view.csrf_exempt = True
+    return view
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from . import toggles
+from .views import (CustomUserViewSet, IngredientViewSet, MetricsView,
+                    RecipeViewSet, TagViewSet)
 
 router = routers.DefaultRouter()
 router.register('users', CustomUserViewSet, basename='users')
@@ -11,7 +13,18 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 
 urlpatterns = [
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_TOGGLES:
+    actions = {url.name: url.callback for url in router.urls}
+    for model, options in toggles.TOGGLES.items():
+        name = f'recipes-{options["url_name"]}'
+        urlpatterns.insert(0, path(
+            f'recipes/<int:pk>/{options["url_name"]}/',
+            toggles.toggle_view(model, fallback=actions[name]),
+            name=name,
+        ))
@@ -1,24 +1,57 @@
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch, Value
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import permissions, response, status, viewsets
+from rest_framework import permissions, response, status, views, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
 
+from recipes.feed import get_feed
+from recipes.ingredient_index import ingredient_index, search_ingredients
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                            Tag)
+                            SimilarRecipe, Tag)
+from recipes.pantry_index import pantry_index
+from recipes.versions import get_versions
 from users.models import Subscribe, User
 from .filters import IngredientFilter, RecipeFilter
+from .metrics import registry
+from .mixins import ConditionalGetMixin, PageCacheMixin, QueryBudgetMixin
+from .pagination import FeedCursorPagination, SwitchablePagination
 from .permissions import IsOwnerOrReadOnly
+from .recipe_import import RecipeImporter
 from .serializers import (FavoriteRecipeSerializer, IngredientSerializer,
+                          PantryRecipeSerializer, RecipeIdsSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
-                          ShoppingCartSerializer, SubscribeSerializer,
-                          TagSerializer)
+                          ShoppingCartSerializer, SimilarRecipeSerializer,
+                          SubscribeSerializer, TagSerializer)
+from .shopping_list import (FORMATS, astream_shopping_list,
+                            get_ingredient_totals, stream_shopping_list)
+from .toggles import bulk_toggle
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(QueryBudgetMixin, UserViewSet):
     queryset = User.objects.all().order_by('id')
     permission_classes = [permissions.AllowAny]
+    pagination_class = SwitchablePagination
+    cursor_ordering = ('id',)
+    query_budget = {
+        'subscriptions': 4,
+    }
+
+    def get_subscriptions(self, request):
+        recipes = Recipe.objects.all()
+        limit = request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            recipes = recipes.limit_per_author(int(limit))
+        return User.objects.filter(author__user=request.user).annotate(
+            is_subscribed=Value(True),
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
 
     @action(
         detail=False,
@@ -28,8 +61,7 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def subscriptions(self, request):
-        user = request.user
-        queryset = User.objects.filter(author__user=user)
+        queryset = self.get_subscriptions(request)
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(
             pages, many=True, context={'request': request},
@@ -65,7 +97,7 @@ class CustomUserViewSet(UserViewSet):
                 author=author
             )
             serializer = SubscribeSerializer(
-                author,
+                self.get_subscriptions(request).get(id=author.id),
                 context={'request': request}
             )
             return response.Response(
@@ -84,31 +116,137 @@ class CustomUserViewSet(UserViewSet):
             )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    etag_versions = ('tag',)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    etag_versions = ('ingredient',)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('search'):
+            return self.conditional_response(self.fuzzy_search, request)
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(self.search, request)
+
+    def search(self, request):
+        serializer = self.get_serializer(
+            ingredient_index.search(request.query_params['name']), many=True
+        )
+        return response.Response(serializer.data)
+
+    def fuzzy_search(self, request):
+        serializer = self.get_serializer(
+            search_ingredients(request.query_params['search']), many=True
+        )
+        return response.Response(serializer.data)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(QueryBudgetMixin, ConditionalGetMixin, PageCacheMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = [IsOwnerOrReadOnly]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = SwitchablePagination
+    query_budget = {
+        'list': 7,
+        'retrieve': 7,
+        'feed': 8,
+        'pantry': 7,
+    }
+    etag_versions = ('tag', 'ingredient', 'user')
+    etag_per_user = True
+    page_cache_versions = ('recipe', 'tag', 'ingredient', 'user')
+
+    def get_stamp(self):
+        if not hasattr(self, '_stamp'):
+            pk = str(self.kwargs.get('pk', ''))
+            self._stamp = pk.isdigit() and Recipe.objects.filter(
+                pk=pk
+            ).values_list('modified', 'favorites_count').first()
+        return self._stamp
+
+    def get_page_stamp(self, request):
+        if not hasattr(self, '_page_stamp'):
+            queryset = self.filter_queryset(
+                Recipe.objects.with_user_flags(request.user)
+            ).only('id', 'pub_date', 'favorites_count')
+            try:
+                page = self.pagination_class().get_page_rows(
+                    queryset, request, self
+                )
+            except NotFound:
+                page = []
+            self._page_stamp = ','.join(
+                f'{recipe.id}={recipe.favorites_count}' for recipe in page
+            )
+        return self._page_stamp
+
+    def get_etag_parts(self, request):
+        parts = super().get_etag_parts(request)
+        if self.action == 'list':
+            return parts + get_versions('recipe') + [
+                self.get_page_stamp(request)
+            ]
+        stamp = self.get_stamp()
+        if not stamp:
+            return None
+        modified, favorites_count = stamp
+        return parts + [
+            self.kwargs['pk'], modified.isoformat(), str(favorites_count)
+        ]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Recipe.objects.with_user_flags(user)
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.with_related(user)
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @action(
+        detail=False,
+        methods=['POST'],
+        permission_classes=[permissions.IsAdminUser],
+        url_path='import',
+        url_name='import',
+    )
+    def import_recipes(self, request):
+        if not isinstance(request.data, list):
+            return response.Response(
+                {'errors': 'Ожидается список рецептов'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > settings.MAX_IMPORT_SIZE:
+            return response.Response(
+                {'errors': 'Слишком много рецептов в одном запросе, '
+                           f'максимум {settings.MAX_IMPORT_SIZE}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        results = list(RecipeImporter(request.user).run(request.data))
+        created = sum('id' in result for result in results)
+        return response.Response(
+            {'created': created, 'results': results},
+            status=(
+                status.HTTP_201_CREATED if created == len(results)
+                else status.HTTP_207_MULTI_STATUS
+            )
+        )
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
@@ -190,6 +328,114 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_204_NO_CONTENT,
         )
 
+    @action(
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='feed',
+        url_name='feed',
+    )
+    def feed(self, request):
+        user = request.user
+        queryset = self.filter_queryset(
+            get_feed(user).with_user_flags(user).with_related(user)
+        )
+        paginator = FeedCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = RecipeReadSerializer(
+            page, many=True, context={'request': request}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        url_path='pantry',
+        url_name='pantry',
+    )
+    def pantry(self, request):
+        ingredient_ids = {
+            int(value)
+            for values in request.query_params.getlist('ingredients')
+            for value in values.split(',')
+            if value.strip().isdigit()
+        }
+        if not ingredient_ids:
+            return response.Response(
+                {'errors': 'Укажите id ингредиентов'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        paginator = PageNumberPagination()
+        page = paginator.paginate_queryset(
+            pantry_index.search(ingredient_ids), request, view=self
+        )
+        user = request.user
+        recipes = Recipe.objects.with_user_flags(user).with_related(
+            user
+        ).in_bulk([pk for pk, *_ in page])
+        found = []
+        for pk, present, total in page:
+            recipe = recipes.get(pk)
+            if recipe is None:
+                continue
+            recipe.coverage = present / total
+            recipe.missing = total - present
+            found.append(recipe)
+        serializer = PantryRecipeSerializer(
+            found, many=True, context={'request': request}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=True,
+        url_path='similar',
+        url_name='similar',
+    )
+    def similar(self, request, pk=None):
+        recipe = get_object_or_404(Recipe, id=pk)
+        similar_recipes = SimilarRecipe.objects.filter(
+            recipe=recipe
+        ).select_related('similar')[:settings.SIMILAR_RECIPES_LIMIT]
+        serializer = SimilarRecipeSerializer(
+            similar_recipes, many=True, context={'request': request}
+        )
+        return response.Response(serializer.data)
+
+    def bulk_toggle(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add = request.method == 'POST'
+        results = bulk_toggle(
+            model, request.user, serializer.validated_data['recipes'], add
+        )
+        done = status.HTTP_201_CREATED if add else status.HTTP_204_NO_CONTENT
+        return response.Response(
+            {'results': results},
+            status=(
+                status.HTTP_200_OK
+                if all(result['status'] == done for result in results)
+                else status.HTTP_207_MULTI_STATUS
+            )
+        )
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='bulk_favorite',
+        url_name='bulk_favorite',
+    )
+    def bulk_favorite(self, request):
+        return self.bulk_toggle(request, FavoriteRecipe)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='bulk_shopping_cart',
+        url_name='bulk_shopping_cart',
+    )
+    def bulk_shopping_cart(self, request):
+        return self.bulk_toggle(request, ShoppingCart)
+
     @action(
         detail=False,
         permission_classes=(permissions.IsAuthenticated,),
@@ -197,29 +443,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='download_shopping_cart',
     )
     def create_shopping_cart_list(self, request):
-        user = request.user
-        shopping_cart = ShoppingCart.objects.filter(user=user)
-        ingredients = {}
-        for cart_item in shopping_cart:
-            recipe = cart_item.recipe
-            for ingredient_recipe in recipe.ingredient_recipes.all():
-                ingredient = ingredient_recipe.ingredient
-                amount = ingredient_recipe.amount
-                if ingredient in ingredients:
-                    ingredients[ingredient] += amount
-                else:
-                    ingredients[ingredient] = amount
-        content = []
-        for ingredient, amount in ingredients.items():
-            content.append(
-                f'{ingredient.name} - {amount} '
-                f'{ingredient.measurement_unit}'
-            )
-        content = '\n'.join(content)
-        response = HttpResponse(
-            content, content_type='text/plain'
-        )
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
-        )
-        return response
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in FORMATS:
+            return response.Response(
+                {'errors': 'Неподдерживаемый формат списка покупок'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, filename = FORMATS[file_format]
+        stream = stream_shopping_list
+        if isinstance(request._request, ASGIRequest):
+            stream = astream_shopping_list
+        shopping_list = StreamingHttpResponse(
+            stream(get_ingredient_totals(request.user), file_format),
+            content_type=content_type,
+        )
+        shopping_list['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return shopping_list
+
+
+class MetricsView(views.APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
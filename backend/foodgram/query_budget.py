@@ -0,0 +1,46 @@
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def check_query_budget(label, count, limit):
+    if limit is None or count <= limit:
+        return
+    message = f'{label}: {count} SQL-запросов при лимите {limit}'
+    if settings.QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryBudgetAdminMixin:
+    changelist_query_budget = None
+
+    def changelist_view(self, request, extra_context=None):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().changelist_view(request, extra_context)
+            if hasattr(response, 'render'):
+                response.render()
+        check_query_budget(
+            f'{self.__class__.__name__}.changelist',
+            counter.count,
+            self.changelist_query_budget,
+        )
+        return response
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +61,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+ASYNC_TOGGLES = os.getenv('ASYNC_TOGGLES', 'true').lower() == 'true'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -74,6 +79,30 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '/var/tmp/foodgram_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    'pages': {
+        'BACKEND': os.getenv(
+            'PAGE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('PAGE_CACHE_LOCATION', 'pages'),
+        'TIMEOUT': int(os.getenv('PAGE_CACHE_TIMEOUT', 60 * 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -145,6 +174,24 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
+QUERY_BUDGET_STRICT = (
+    os.getenv('QUERY_BUDGET_STRICT', 'false').lower() == 'true'
+)
+
+BULK_BATCH_SIZE = 1000
+MAX_IMPORT_SIZE = 5000
+MAX_BULK_SIZE = 500
+INGREDIENT_SEARCH_LIMIT = 20
+FEED_FANOUT_THRESHOLD = int(os.getenv('FEED_FANOUT_THRESHOLD', 100))
+SIMILAR_RECIPES_LIMIT = 10
+SIMILAR_TAG_WEIGHT = 0.5
+
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_IMAGE_PIXELS = 25_000_000
+THUMBNAIL_SIZE = (400, 400)
+WEBP_QUALITY = 80
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
 MAX_VAL150 = 150
 MAX_VAL200 = 200
 MIN_SCORE = 1
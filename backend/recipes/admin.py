@@ -1,12 +1,14 @@
 from django.contrib import admin
 
+from foodgram.query_budget import QueryBudgetAdminMixin
 from .models import (FavoriteRecipe, Ingredient, IngredientRecipe, Recipe,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingListItem, Tag)
 
 
 class IngredientInline(admin.TabularInline):
     model = IngredientRecipe
     extra = 2
+    autocomplete_fields = ('ingredient', )
 
 
 @admin.register(Tag)
@@ -17,33 +19,63 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(IngredientRecipe)
-class IngredientRecipeAdmin(admin.ModelAdmin):
+class IngredientRecipeAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount', )
+    list_select_related = ('recipe', 'ingredient', )
+    autocomplete_fields = ('recipe', 'ingredient', )
+    show_full_result_count = False
+    changelist_query_budget = 3
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit', )
     search_fields = ('name', )
-    list_filter = ('name', )
+    list_filter = ('measurement_unit', )
+    ordering = ('name', )
+    show_full_result_count = False
+    changelist_query_budget = 4
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author', )
-    search_fields = ('author', 'name', 'tags', )
+class RecipeAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'id', 'name', 'author', 'favorites_count', 'in_carts_count',
+    )
+    list_select_related = ('author', )
+    search_fields = ('name', 'author__username', 'author__email', )
+    list_filter = ('tags', )
+    autocomplete_fields = ('author', )
+    readonly_fields = ('favorites_count', 'in_carts_count', )
     inlines = (IngredientInline,)
+    show_full_result_count = False
+    changelist_query_budget = 4
 
 
 @admin.register(FavoriteRecipe)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe', )
-    search_fields = ('user', )
-    list_filter = ('user', )
+    list_select_related = ('user', 'recipe', )
+    search_fields = ('user__email', 'recipe__name', )
+    autocomplete_fields = ('user', 'recipe', )
+    show_full_result_count = False
+    changelist_query_budget = 3
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe', )
-    search_fields = ('user', )
-    list_filter = ('user', )
+    list_select_related = ('user', 'recipe', )
+    search_fields = ('user__email', 'recipe__name', )
+    autocomplete_fields = ('user', 'recipe', )
+    show_full_result_count = False
+    changelist_query_budget = 3
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'user', 'ingredient', 'amount', )
+    list_select_related = ('user', 'ingredient', )
+    search_fields = ('user__email', )
+    show_full_result_count = False
+    changelist_query_budget = 3
@@ -0,0 +1,69 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscribe, User
+from .models import FavoriteRecipe, Recipe, ShoppingCart
+
+COUNTERS = {
+    FavoriteRecipe: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe', 'in_carts_count'),
+    Recipe: (User, 'author', 'recipes_count'),
+    Subscribe: (User, 'author', 'followers_count'),
+}
+
+
+def adjust_counter(model, target_ids, delta):
+    """Сдвигает счётчик на delta для каждого вхождения id в target_ids."""
+    target, _, field = COUNTERS[model]
+    steps = defaultdict(list)
+    for pk, times in Counter(target_ids).items():
+        steps[delta * times].append(pk)
+    for step, pks in steps.items():
+        target.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + step, Value(0))}
+        )
+
+
+def actual_count(model):
+    _, foreign_key, _ = COUNTERS[model]
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{foreign_key: OuterRef('pk')}
+            ).order_by().values(foreign_key).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0,
+    )
+
+
+def counter_drift():
+    drift = []
+    for model, (target, _, field) in COUNTERS.items():
+        drift.extend(
+            (target, field, pk, stored, actual)
+            for pk, stored, actual in target.objects.annotate(
+                actual=actual_count(model)
+            ).exclude(
+                **{field: F('actual')}
+            ).values_list('pk', field, 'actual')
+        )
+    return drift
+
+
+def reconcile_counters(drift):
+    for model, (target, _, field) in COUNTERS.items():
+        pks = [pk for owner, name, pk, *_ in drift
+               if owner is target and name == field]
+        if pks:
+            target.objects.filter(pk__in=pks).update(
+                **{field: actual_count(model)}
+            )
+
+
+def recount_all():
+    for model, (target, _, field) in COUNTERS.items():
+        target.objects.update(**{field: actual_count(model)})
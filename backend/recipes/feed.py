@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+
+from users.models import Subscribe
+from .models import FeedEntry, Recipe
+
+
+def follows_count(user_id):
+    return Subscribe.objects.filter(user_id=user_id).count()
+
+
+def uses_timeline(count):
+    return count >= settings.FEED_FANOUT_THRESHOLD
+
+
+def get_feed(user):
+    """Сохранённая лента для активных подписчиков, иначе join по подпискам."""
+    if uses_timeline(follows_count(user.id)):
+        return Recipe.objects.filter(
+            Exists(FeedEntry.objects.filter(user=user, recipe=OuterRef('pk')))
+        )
+    return Recipe.objects.filter(
+        Exists(Subscribe.objects.filter(user=user, author=OuterRef('author')))
+    )
+
+
+def add_entries(user_id, recipes):
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in recipes.values_list('id', flat=True).iterator()
+        ),
+        batch_size=settings.BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def materialize(user_id):
+    with transaction.atomic():
+        FeedEntry.objects.filter(user_id=user_id).delete()
+        add_entries(user_id, Recipe.objects.filter(
+            author__author__user_id=user_id
+        ))
+
+
+def fan_out(recipes):
+    """Раскладывает новые рецепты по сохранённым лентам подписчиков."""
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe.id)
+    follows = Subscribe.objects.filter(
+        user=OuterRef('user')
+    ).order_by().values('user').annotate(total=Count('pk')).values('total')
+    followers = Subscribe.objects.filter(
+        author_id__in=by_author
+    ).annotate(
+        follows=Subquery(follows)
+    ).filter(
+        follows__gte=settings.FEED_FANOUT_THRESHOLD
+    ).values_list('author_id', 'user_id')
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for author_id, user_id in followers
+            for recipe_id in by_author[author_id]
+        ),
+        batch_size=settings.BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def follow(user_id, author_id):
+    count = follows_count(user_id)
+    if count == settings.FEED_FANOUT_THRESHOLD:
+        materialize(user_id)
+    elif uses_timeline(count):
+        add_entries(user_id, Recipe.objects.filter(author_id=author_id))
+
+
+def unfollow(user_id, author_id):
+    if uses_timeline(follows_count(user_id)):
+        FeedEntry.objects.filter(
+            user_id=user_id, recipe__author_id=author_id
+        ).delete()
+    else:
+        FeedEntry.objects.filter(user_id=user_id).delete()
+
+
+def rebuild_feeds():
+    users = Subscribe.objects.order_by().values('user').annotate(
+        total=Count('pk')
+    ).filter(total__gte=settings.FEED_FANOUT_THRESHOLD).values_list(
+        'user', flat=True
+    )
+    users = list(users)
+    FeedEntry.objects.exclude(user__in=users).delete()
+    for user_id in users:
+        materialize(user_id)
+    return len(users)
@@ -0,0 +1,83 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
+
+VARIANTS = {
+    'thumbnail': settings.THUMBNAIL_SIZE,
+    'webp': None,
+}
+VARIANTS_DIR = 'recipes/img/variants'
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS, thread_name_prefix='recipe-images'
+)
+
+
+def get_variant_name(name, variant):
+    suffix = f'_{variant}' if VARIANTS[variant] else ''
+    return f'{VARIANTS_DIR}/{PurePosixPath(name).stem}{suffix}.webp'
+
+
+def build_variants(name):
+    variants = {}
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            if size:
+                resized.thumbnail(size)
+            buffer = BytesIO()
+            resized.save(buffer, 'WEBP', quality=settings.WEBP_QUALITY)
+            variant_name = get_variant_name(name, variant)
+            if default_storage.exists(variant_name):
+                default_storage.delete(variant_name)
+            variants[variant] = default_storage.save(
+                variant_name, ContentFile(buffer.getvalue())
+            )
+    return variants
+
+
+def save_variants(recipe_id, name, variants):
+    return Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=variants
+    )
+
+
+def process_image(recipe_id, name):
+    try:
+        save_variants(recipe_id, name, build_variants(name))
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe):
+    if recipe.image:
+        recipe_id, name = recipe.id, recipe.image.name
+        transaction.on_commit(
+            lambda: executor.submit(process_image, recipe_id, name)
+        )
+
+
+def get_variant_urls(recipe, request=None):
+    urls = {}
+    for variant, name in (recipe.image_variants or {}).items():
+        url = default_storage.url(name)
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
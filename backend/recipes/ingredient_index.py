@@ -0,0 +1,123 @@
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Ingredient
+from .search import search_enabled
+from .versions import VersionedSnapshot
+
+WORD_SEPARATOR = re.compile(r'[^\w]+')
+SIMILARITY_THRESHOLD = 0.5
+
+
+def fold(value):
+    return value.casefold().strip()
+
+
+def trigrams(value):
+    result = set()
+    for word in WORD_SEPARATOR.split(value):
+        if word:
+            padded = f'  {word} '
+            result.update(
+                padded[position:position + 3]
+                for position in range(len(padded) - 2)
+            )
+    return result
+
+
+class IngredientIndex(VersionedSnapshot):
+    version_name = 'ingredient'
+
+    def build(self):
+        ingredients = {}
+        names = []
+        words = []
+        grams = defaultdict(list)
+        for ingredient in Ingredient.objects.order_by('name').iterator():
+            ingredients[ingredient.id] = ingredient
+            name = fold(ingredient.name)
+            names.append((name, ingredient.id))
+            for word in WORD_SEPARATOR.split(name)[1:]:
+                if word:
+                    words.append((word, ingredient.id))
+            for gram in trigrams(name):
+                grams[gram].append(ingredient.id)
+        names.sort()
+        words.sort()
+        return ingredients, names, words, dict(grams)
+
+    @staticmethod
+    def match_prefix(keys, prefix):
+        position = bisect_left(keys, (prefix,))
+        while position < len(keys) and keys[position][0].startswith(prefix):
+            yield keys[position]
+            position += 1
+
+    def search(self, query):
+        ingredients, names, words, _ = self.get_snapshot()
+        prefix = fold(query)
+        exact, starts, contains = [], [], []
+        for name, pk in self.match_prefix(names, prefix):
+            (exact if name == prefix else starts).append(pk)
+        found = set(exact) | set(starts)
+        for _, pk in self.match_prefix(words, prefix):
+            if pk not in found:
+                found.add(pk)
+                contains.append(pk)
+        contains.sort(key=lambda pk: fold(ingredients[pk].name))
+        return [ingredients[pk] for pk in exact + starts + contains]
+
+    def fuzzy_search(self, query, limit):
+        ingredients, _, _, grams = self.get_snapshot()
+        folded = fold(query)
+        matched = self.search(query)
+        found = {ingredient.id for ingredient in matched}
+        if len(matched) >= limit or not folded:
+            return matched[:limit]
+        query_grams = trigrams(folded)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(grams.get(gram, ()))
+        infix, similar = [], []
+        for pk, common in shared.items():
+            if pk in found:
+                continue
+            name = fold(ingredients[pk].name)
+            similarity = common / len(query_grams)
+            if folded in name:
+                infix.append((-similarity, name, pk))
+            elif similarity >= SIMILARITY_THRESHOLD:
+                similar.append((-similarity, name, pk))
+        matched.extend(
+            ingredients[pk] for *_, pk in sorted(infix) + sorted(similar)
+        )
+        return matched[:limit]
+
+
+def search_ingredients(query, limit=None):
+    """Префикс, начало слова, вхождение и триграммное сходство."""
+    limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+    if not search_enabled():
+        return ingredient_index.fuzzy_search(query, limit)
+    query = query.strip()
+    return Ingredient.objects.filter(
+        Q(name__icontains=query) | Q(name__trigram_word_similar=query)
+    ).annotate(
+        match_tier=Case(
+            When(name__iexact=query, then=Value(0)),
+            When(name__istartswith=query, then=Value(1)),
+            When(name__iregex=rf'\m{re.escape(query)}', then=Value(2)),
+            When(name__icontains=query, then=Value(3)),
+            default=Value(4),
+            output_field=IntegerField(),
+        ),
+        similarity=TrigramWordSimilarity(query, 'name'),
+    ).order_by('match_tier', '-similarity', 'name')[:limit]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,51 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipes.images import build_variants, save_variants
+from recipes.models import Recipe
+
+
+def build(recipe_id, name):
+    try:
+        return recipe_id, name, build_variants(name), None
+    except Exception as error:
+        return recipe_id, name, None, str(error)
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры и WebP-варианты картинок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.IMAGE_WORKERS
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='пересоздать варианты, даже если они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image=None)
+        if not options['force']:
+            recipes = recipes.filter(image_variants={})
+        pending = list(recipes.values_list('id', 'image'))
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [
+                pool.submit(build, recipe_id, name)
+                for recipe_id, name in pending
+            ]
+            for future in as_completed(futures):
+                recipe_id, name, variants, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                done += save_variants(recipe_id, name, variants)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import refresh_similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу похожих рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='пересчитать все рецепты, а не только изменённые',
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='сколько похожих рецептов хранить для каждого',
+        )
+
+    def handle(self, *args, **options):
+        count = refresh_similar_recipes(
+            full=options['full'], limit=options['limit']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {count}'
+        ))
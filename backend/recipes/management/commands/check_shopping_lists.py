@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сводные списки покупок с содержимым корзин'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='пересобрать списки расходящихся пользователей',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = ShoppingListItem.objects.inconsistencies()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        for user, ingredient, expected, actual in mismatches:
+            self.stdout.write(
+                f'user={user} ingredient={ingredient} '
+                f'ожидается={expected} в таблице={actual}'
+            )
+        if options['fix']:
+            ShoppingListItem.objects.refresh(
+                users={user for user, *_ in mismatches}
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено расхождений: {len(mismatches)}'
+            ))
+            return
+        raise CommandError(f'Найдено расхождений: {len(mismatches)}')
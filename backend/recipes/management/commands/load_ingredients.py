@@ -0,0 +1,161 @@
+import codecs
+import csv
+import json
+import re
+import time
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient
+from recipes.versions import bump_version
+
+DEFAULT_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.json'
+CHUNK_SIZE = 64 * 1024
+CYRILLIC_ENCODINGS = ('cp1251', 'mac_cyrillic', 'koi8_r', 'cp866')
+FOREIGN_CHARACTER = re.compile(r'[^\t\r\n\x20-\x7eа-яА-ЯёЁ«»„“”‘’–—№…]')
+
+
+def detect_encoding(path):
+    with open(path, 'rb') as file:
+        sample = file.read(CHUNK_SIZE)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        pass
+    else:
+        return 'utf-8'
+    matches = [
+        encoding for encoding in CYRILLIC_ENCODINGS
+        if not FOREIGN_CHARACTER.search(
+            sample.decode(encoding, errors='replace')
+        )
+    ]
+    if len(matches) != 1:
+        raise CommandError(
+            f'Не удалось определить кодировку файла {path}, '
+            'укажите её через --encoding'
+        )
+    return matches[0]
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), ''):
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip(' \t\r\n,[')
+            if not buffer or buffer.startswith(']'):
+                break
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                break
+            buffer = buffer[end:]
+            yield item['name'], item['measurement_unit']
+    if buffer.strip(' \t\r\n]'):
+        raise CommandError(f'Не удалось разобрать JSON: {buffer[:50]!r}')
+
+
+def parse_csv_row(row, with_id):
+    if len(row) == 1:
+        row = next(csv.reader(row))
+    if with_id:
+        row = row[1:]
+    if len(row) < 2:
+        return '', ''
+    return ','.join(row[:-1]).strip(), row[-1].strip()
+
+
+def read_csv(file):
+    rows = csv.reader(line.rstrip('\r\n').rstrip(';') for line in file)
+    header = next(rows, [])
+    with_id = header[:1] == ['id']
+    if 'name' not in header:
+        rows = chain([header], rows)
+    for row in rows:
+        name, measurement_unit = parse_csv_row(row, with_id)
+        if name and measurement_unit:
+            yield name, measurement_unit
+
+
+READERS = {
+    '.json': read_json,
+    '.jsonl': read_json,
+    '.csv': read_csv,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из data/ingredients.csv или .json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument(
+            '--encoding', help='кодировка файла (по умолчанию определяется)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='показать новые ингредиенты, ничего не записывая',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+        encoding = options['encoding'] or detect_encoding(path)
+        max_length = Ingredient._meta.get_field('name').max_length
+        started = time.perf_counter()
+        existing = set(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+        seen = set()
+        batch = []
+        total = created = 0
+        with open(path, encoding=encoding, newline='') as file:
+            for name, measurement_unit in reader(file):
+                total += 1
+                key = (name, measurement_unit)
+                if key in existing or key in seen:
+                    continue
+                if len(name) > max_length or len(measurement_unit) > (
+                    max_length
+                ):
+                    self.stderr.write(f'Пропущено (слишком длинное): {name}')
+                    continue
+                seen.add(key)
+                created += 1
+                if options['dry_run']:
+                    self.stdout.write(f'+ {name} ({measurement_unit})')
+                    continue
+                batch.append(Ingredient(
+                    name=name, measurement_unit=measurement_unit
+                ))
+                if len(batch) >= options['batch_size']:
+                    self.save(batch)
+                    batch = []
+        if batch:
+            self.save(batch)
+        if created and not options['dry_run']:
+            bump_version('ingredient')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Будет добавлено" if options["dry_run"] else "Добавлено"}: '
+            f'{created}, уже в базе: {total - created}, '
+            f'кодировка: {encoding}, {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
+
+    def save(self, batch):
+        Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сохранённые ленты по текущему FEED_FANOUT_THRESHOLD'
+
+    def handle(self, *args, **options):
+        users = rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {users}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводные списки покупок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='id пользователя (можно указать несколько раз)',
+        )
+
+    def handle(self, *args, **options):
+        ShoppingListItem.objects.refresh(users=options['users'])
+        self.stdout.write(self.style.SUCCESS(
+            'Списки покупок пересобраны, строк: '
+            f'{ShoppingListItem.objects.count()}'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.counters import counter_drift, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики избранного, корзин, рецептов и подписчиков'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='записать в счётчики фактические значения',
+        )
+
+    def handle(self, *args, **options):
+        drift = counter_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        for target, field, pk, stored, actual in drift:
+            self.stdout.write(
+                f'{target._meta.model_name}={pk} {field} '
+                f'в таблице={stored} фактически={actual}'
+            )
+        if options['fix']:
+            reconcile_counters(drift)
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено расхождений: {len(drift)}'
+            ))
+            return
+        raise CommandError(f'Найдено расхождений: {len(drift)}')
@@ -0,0 +1,250 @@
+import math
+import random
+import time
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.counters import recount_all
+from recipes.feed import rebuild_feeds
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, ShoppingListItem, Tag)
+from recipes.search import update_search_vector
+from recipes.versions import bump_version
+from users.models import Subscribe, User
+
+INGREDIENTS_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.json'
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F9A62B', 'dessert'),
+    ('Выпечка', '#B5651D', 'baking'),
+    ('Вегетарианское', '#2E8B57', 'vegetarian'),
+)
+DISHES = (
+    'суп', 'салат', 'рагу', 'пирог', 'омлет', 'паста', 'плов', 'каша',
+    'запеканка', 'котлеты', 'блины', 'оладьи', 'рулет', 'соус', 'жаркое',
+)
+STYLES = (
+    'домашний', 'быстрый', 'праздничный', 'бабушкин', 'летний', 'зимний',
+    'острый', 'нежный', 'деревенский', 'постный', 'сытный', 'лёгкий',
+)
+AMOUNTS = (1, 2, 3, 5, 10, 20, 50, 100, 150, 200, 250, 300, 500, 1000)
+PASSWORD = 'foodgram-seed'
+
+
+def zipf_weights(size, exponent):
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(size)))
+
+
+def sample_unique(rng, population, cum_weights, count):
+    count = min(count, len(population))
+    chosen = set()
+    for _ in range(count * 4):
+        if len(chosen) == count:
+            break
+        chosen.add(rng.choices(population, cum_weights=cum_weights)[0])
+    return chosen
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'избранным, корзинами и подписками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=15,
+            help='среднее число избранных рецептов пользователя',
+        )
+        parser.add_argument(
+            '--cart', type=int, default=4,
+            help='среднее число рецептов в корзине пользователя',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.BULK_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.started = time.perf_counter()
+        ingredient_ids, tag_ids = self.prepare_catalog()
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, ingredient_ids, tag_ids
+        )
+        self.create_subscriptions(user_ids, options['follows'])
+        recipe_weights = zipf_weights(len(recipe_ids), 0.9)
+        popular = recipe_ids[:]
+        self.rng.shuffle(popular)
+        for model, average in (
+            (FavoriteRecipe, options['favorites']),
+            (ShoppingCart, options['cart']),
+        ):
+            self.create_choices(
+                model, user_ids, popular, recipe_weights, average
+            )
+        self.refresh_derived()
+
+    def report(self, label, count):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f'{label}: {count} ({elapsed:.1f} с)')
+
+    def save(self, model, objects, **kwargs):
+        created = []
+        for batch in batched(objects, self.batch_size):
+            created.extend(model.objects.bulk_create(batch, **kwargs))
+        return created
+
+    def prepare_catalog(self):
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', str(INGREDIENTS_PATH))
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        ingredient_ids = sorted(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError('Нет ингредиентов для рецептов')
+        self.rng.shuffle(ingredient_ids)
+        tag_ids = sorted(Tag.objects.values_list('id', flat=True))
+        self.rng.shuffle(tag_ids)
+        return ingredient_ids, tag_ids
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        offset = User.objects.count()
+        users = self.save(User, (
+            User(
+                email=f'seed{offset + number}@example.com',
+                username=f'seed{offset + number}',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            )
+            for number in range(count)
+        ))
+        self.report('Пользователи', len(users))
+        return [user.id for user in users]
+
+    def create_recipes(self, count, user_ids, ingredient_ids, tag_ids):
+        rng = self.rng
+        author_weights = zipf_weights(len(user_ids), 1.1)
+        ingredient_weights = zipf_weights(len(ingredient_ids), 1.0)
+        tag_weights = zipf_weights(len(tag_ids), 0.7)
+        recipe_ids = []
+        links = 0
+        for batch in batched(range(count), self.batch_size):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=rng.choices(
+                        user_ids, cum_weights=author_weights
+                    )[0],
+                    name=(
+                        f'{rng.choice(STYLES).capitalize()} '
+                        f'{rng.choice(DISHES)} №{number + 1}'
+                    ),
+                    text='Синтетический рецепт для нагрузочного тестирования.',
+                    cooking_time=max(settings.MIN_SCORE, min(
+                        settings.MAX_SCORE,
+                        int(rng.lognormvariate(math.log(30), 0.6)),
+                    )),
+                )
+                for number in batch
+            )
+            ingredients = []
+            tags = []
+            for recipe in recipes:
+                size = max(2, min(20, round(rng.gauss(8, 3))))
+                ingredients.extend(
+                    IngredientRecipe(
+                        recipe_id=recipe.id,
+                        ingredient_id=ingredient_id,
+                        amount=rng.choice(AMOUNTS),
+                    )
+                    for ingredient_id in sample_unique(
+                        rng, ingredient_ids, ingredient_weights, size
+                    )
+                )
+                tag_count = 1 + (rng.random() < 0.4) + (rng.random() < 0.1)
+                tags.extend(
+                    Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                    for tag_id in sample_unique(
+                        rng, tag_ids, tag_weights, tag_count
+                    )
+                )
+            self.save(IngredientRecipe, ingredients)
+            self.save(Recipe.tags.through, tags)
+            links += len(ingredients) + len(tags)
+            recipe_ids.extend(recipe.id for recipe in recipes)
+        self.report('Рецепты', len(recipe_ids))
+        self.report('Ингредиенты и теги рецептов', links)
+        return recipe_ids
+
+    def create_subscriptions(self, user_ids, average):
+        rng = self.rng
+        # Популярность авторов та же, что и при раздаче рецептов,
+        # число подписок распределено по Парето.
+        weights = zipf_weights(len(user_ids), 1.1)
+        scale = average / 3
+
+        def subscriptions():
+            for user_id in user_ids:
+                count = int(rng.paretovariate(1.5) * scale)
+                for author_id in sample_unique(
+                    rng, user_ids, weights, count
+                ):
+                    if author_id != user_id:
+                        yield Subscribe(user_id=user_id, author_id=author_id)
+
+        created = self.save(Subscribe, subscriptions(), ignore_conflicts=True)
+        self.report('Подписки', len(created))
+
+    def create_choices(self, model, user_ids, recipe_ids, weights, average):
+        rng = self.rng
+
+        def choices():
+            for user_id in user_ids:
+                count = int(rng.expovariate(1 / average)) if average else 0
+                for recipe_id in sample_unique(
+                    rng, recipe_ids, weights, count
+                ):
+                    yield model(user_id=user_id, recipe_id=recipe_id)
+
+        created = self.save(model, choices(), ignore_conflicts=True)
+        self.report(model._meta.verbose_name_plural, len(created))
+
+    def refresh_derived(self):
+        recount_all()
+        self.report('Счётчики пересчитаны', 4)
+        update_search_vector(Recipe.objects.all())
+        ShoppingListItem.objects.refresh()
+        self.report(
+            'Строки списков покупок', ShoppingListItem.objects.count()
+        )
+        self.report('Сохранённые ленты', rebuild_feeds())
+        bump_version('ingredient', 'tag', 'recipe', 'pantry', 'user')
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'FavoriteRecipe', 'recipes', 'Recipe',
+     'recipe', 'favorites_count'),
+    ('recipes', 'ShoppingCart', 'recipes', 'Recipe',
+     'recipe', 'in_carts_count'),
+    ('recipes', 'Recipe', 'users', 'User', 'author', 'recipes_count'),
+    ('users', 'Subscribe', 'users', 'User', 'author', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, name, target_app, target_name, foreign_key, field in COUNTERS:
+        model = apps.get_model(app, name)
+        target = apps.get_model(target_app, target_name)
+        target.objects.update(**{field: Coalesce(
+            Subquery(
+                model.objects.filter(
+                    **{foreign_key: OuterRef('pk')}
+                ).order_by().values(foreign_key).annotate(
+                    total=Count('pk')
+                ).values('total')
+            ),
+            0,
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_image_variants'),
+        ('users', '0011_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,13 @@
 from colorfield.fields import ColorField
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Sum, Value, Window
+from django.db.models.functions import RowNumber
+
+from users.models import Subscribe
 
 User = get_user_model()
 
@@ -48,6 +53,57 @@ class Tag(models.Model):
         verbose_name_plural = 'Тег'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self, user):
+        ingredients = Prefetch(
+            'ingredient_recipes',
+            queryset=IngredientRecipe.objects.select_related('ingredient'),
+        )
+        if user.is_anonymous:
+            return self.select_related('author').prefetch_related(
+                'tags', ingredients,
+            )
+        authors = User.objects.annotate(
+            is_subscribed=Exists(
+                Subscribe.objects.filter(user=user, author=OuterRef('pk'))
+            )
+        )
+        return self.prefetch_related(
+            Prefetch('author', queryset=authors),
+            'tags',
+            ingredients,
+        )
+
+    def limit_per_author(self, limit):
+        return self.annotate(
+            author_rank=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('pub_date').desc(), F('id').desc()),
+            )
+        ).filter(author_rank__lte=limit)
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )
+            ),
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -67,6 +123,31 @@ class Recipe(models.Model):
         upload_to='recipes/img/',
         null=True,
     )
+    image_variants = models.JSONField(
+        'Варианты картинки',
+        default=dict,
+        blank=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    similar_computed = models.DateTimeField(
+        'Похожие рецепты пересчитаны',
+        null=True,
+        editable=False,
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         through='IngredientRecipe',
@@ -96,11 +177,23 @@ class Recipe(models.Model):
         'Время публикации',
         auto_now_add=True,
     )
+    modified = models.DateTimeField(
+        'Время изменения',
+        auto_now=True,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепты'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx',
+            )
+        ]
 
 
 class IngredientRecipe(models.Model):
@@ -189,3 +282,148 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_cart',
             )
         ]
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+
+    def expected_totals(self, users=None, ingredients=None):
+        lookups = {'recipe__shopping_cart__isnull': False}
+        if users is not None:
+            lookups['recipe__shopping_cart__user__in'] = users
+        if ingredients is not None:
+            lookups['ingredient__in'] = ingredients
+        return IngredientRecipe.objects.filter(**lookups).values(
+            'recipe__shopping_cart__user', 'ingredient',
+        ).annotate(total=Sum('amount')).order_by()
+
+    def refresh(self, users=None, ingredients=None):
+        with transaction.atomic():
+            stale = self.all()
+            if users is not None:
+                stale = stale.filter(user__in=users)
+            if ingredients is not None:
+                stale = stale.filter(ingredient__in=ingredients)
+            stale.delete()
+            self.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=item['recipe__shopping_cart__user'],
+                        ingredient_id=item['ingredient'],
+                        amount=item['total'],
+                    )
+                    for item in self.expected_totals(
+                        users, ingredients
+                    ).iterator()
+                ),
+                batch_size=settings.BULK_BATCH_SIZE,
+            )
+
+    def inconsistencies(self):
+        expected = {
+            (item['recipe__shopping_cart__user'], item['ingredient']):
+                item['total']
+            for item in self.expected_totals().iterator()
+        }
+        actual = {
+            (user, ingredient): amount
+            for user, ingredient, amount in self.values_list(
+                'user', 'ingredient', 'amount'
+            ).iterator()
+        }
+        return [
+            (user, ingredient, expected.get((user, ingredient)),
+             actual.get((user, ingredient)))
+            for user, ingredient in sorted(expected.keys() | actual.keys())
+            if expected.get((user, ingredient))
+            != actual.get((user, ingredient))
+        ]
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+    )
+    amount = models.PositiveIntegerField(
+        'Количество',
+    )
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item',
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry',
+            )
+        ]
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='similar_recipes',
+        on_delete=models.CASCADE,
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        verbose_name='Похожий рецепт',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    score = models.FloatField(
+        'Сходство',
+    )
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx',
+            )
+        ]
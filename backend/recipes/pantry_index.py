@@ -0,0 +1,94 @@
+import heapq
+from array import array
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from .models import IngredientRecipe, Recipe
+from .versions import VersionedSnapshot
+
+
+class Ranking:
+    """Выдача по покрытию: сортируются только записи до конца среза."""
+
+    def __init__(self, recipe_ids, sizes, hits):
+        self.recipe_ids = recipe_ids
+        self.sizes = sizes
+        self.hits = hits
+
+    def __len__(self):
+        return len(self.hits)
+
+    def key(self, item):
+        position, found = item
+        size = self.sizes[position]
+        return -found / size, size - found, position
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            stop = len(self) if index.stop is None else index.stop
+            ranked = heapq.nsmallest(stop, self.hits.items(), key=self.key)
+            return [self.resolve(item) for item in ranked[index]]
+        return self[index:index + 1][0]
+
+    def resolve(self, item):
+        position, found = item
+        return self.recipe_ids[position], found, self.sizes[position]
+
+
+class PantryIndex(VersionedSnapshot):
+    version_name = 'pantry'
+
+    def build(self):
+        recipe_ids = list(
+            Recipe.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        positions = {pk: position for position, pk in enumerate(recipe_ids)}
+        sizes = array('I', bytes(4 * len(recipe_ids)))
+        postings = defaultdict(lambda: array('I'))
+        for recipe_id, ingredient_id in IngredientRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            position = positions.get(recipe_id)
+            if position is None:
+                continue
+            postings[ingredient_id].append(position)
+            sizes[position] += 1
+        return recipe_ids, sizes, dict(postings)
+
+    @staticmethod
+    def rank(snapshot, ingredient_ids):
+        recipe_ids, sizes, postings = snapshot
+        hits = Counter()
+        for ingredient_id in ingredient_ids:
+            hits.update(postings.get(ingredient_id, ()))
+        return Ranking(recipe_ids, sizes, hits)
+
+    def search(self, ingredient_ids):
+        """[(id рецепта, найдено ингредиентов, всего ингредиентов)]."""
+        ingredient_ids = set(ingredient_ids)
+        snapshot = self.get_ready_snapshot()
+        if snapshot is not None:
+            return self.rank(snapshot, ingredient_ids)
+        return list(
+            Recipe.objects.annotate(
+                found=Count(
+                    'ingredient_recipes',
+                    filter=Q(
+                        ingredient_recipes__ingredient__in=ingredient_ids
+                    ),
+                ),
+                total=Count('ingredient_recipes'),
+            ).filter(found__gt=0).annotate(
+                coverage=Cast('found', FloatField()) / F('total'),
+                missing=F('total') - F('found'),
+            ).order_by(
+                '-coverage', 'missing', '-pub_date', '-id'
+            ).values_list('id', 'found', 'total')
+        )
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,44 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+SEARCH_CONFIGS = ('russian', 'english')
+
+
+def search_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def build_search_vector():
+    vector = None
+    for config in SEARCH_CONFIGS:
+        for field, weight in (('name', 'A'), ('text', 'B')):
+            part = SearchVector(field, weight=weight, config=config)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vector(queryset):
+    if search_enabled():
+        queryset.update(search_vector=build_search_vector())
+
+
+def search_recipes(queryset, value):
+    if not search_enabled():
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        ).annotate(
+            search_rank=Case(
+                When(name__icontains=value, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        ).order_by('-search_rank', '-pub_date', '-id')
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(value, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query)
+    ).order_by('-search_rank', '-pub_date', '-id')
@@ -0,0 +1,145 @@
+from django.db.models import QuerySet
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from users.models import Subscribe, User
+from .counters import COUNTERS, adjust_counter
+from .feed import fan_out, follow, unfollow
+from .models import (FavoriteRecipe, Ingredient, IngredientRecipe, Recipe,
+                     ShoppingCart, ShoppingListItem, Tag)
+from .search import update_search_vector
+from .versions import bump_version
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredient_version(**kwargs):
+    bump_version('ingredient')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tag_version(**kwargs):
+    bump_version('tag')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_version(**kwargs):
+    bump_version('recipe')
+
+
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+def bump_pantry_version(raw=False, **kwargs):
+    if not raw:
+        bump_version('pantry')
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_user_version(update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version('user')
+
+
+@receiver((post_save, post_delete), sender=FavoriteRecipe)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscribe)
+def bump_viewer_version(instance, **kwargs):
+    bump_version(f'viewer:{instance.user_id}')
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscribe)
+def increment_counter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _, foreign_key, _ = COUNTERS[sender]
+        adjust_counter(sender, [getattr(instance, f'{foreign_key}_id')], 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscribe)
+def decrement_counter(sender, instance, **kwargs):
+    _, foreign_key, _ = COUNTERS[sender]
+    adjust_counter(sender, [getattr(instance, f'{foreign_key}_id')], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_search_vector(instance, raw=False, update_fields=None, **kwargs):
+    if raw or update_fields and not {'name', 'text'} & set(update_fields):
+        return
+    update_search_vector(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out([instance])
+
+
+@receiver(post_save, sender=Subscribe)
+def add_to_feed(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def remove_from_feed(instance, **kwargs):
+    unfollow(instance.user_id, instance.author_id)
+
+
+def deleted_with(origin, *models):
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(
+        origin
+    )
+    return origin_model in models
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def refresh_shopping_list(instance, raw=False, origin=None, **kwargs):
+    if raw or deleted_with(origin, Recipe, User):
+        return
+    ShoppingListItem.objects.refresh(
+        users=[instance.user_id],
+        ingredients=IngredientRecipe.objects.filter(
+            recipe_id=instance.recipe_id
+        ).values('ingredient'),
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_shopping_list(instance, **kwargs):
+    instance._shopping_list_users = list(
+        instance.shopping_cart.values_list('user', flat=True)
+    )
+    if instance._shopping_list_users:
+        instance._shopping_list_ingredients = list(
+            instance.ingredient_recipes.values_list('ingredient', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def refresh_deleted_recipe_shopping_list(instance, **kwargs):
+    users = getattr(instance, '_shopping_list_users', None)
+    if users:
+        ShoppingListItem.objects.refresh(
+            users=users, ingredients=instance._shopping_list_ingredients
+        )
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def refresh_recipe_shopping_lists(instance, raw=False, origin=None,
+                                  **kwargs):
+    if raw or deleted_with(origin, Recipe, User):
+        return
+    users = ShoppingCart.objects.filter(
+        recipe_id=instance.recipe_id
+    ).values('user')
+    if users.exists():
+        ShoppingListItem.objects.refresh(users=users)
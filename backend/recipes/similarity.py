@@ -0,0 +1,140 @@
+"""Похожие рецепты: косинусное сходство наборов ингредиентов и тегов.
+
+Признаки рецепта — его ингредиенты и теги с весами IDF (теги дополнительно
+умножаются на SIMILAR_TAG_WEIGHT), строки матрицы нормированы, поэтому
+произведение X @ X.T даёт косинусное сходство. Для каждого рецепта
+хранятся SIMILAR_RECIPES_LIMIT ближайших соседей в SimilarRecipe.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from scipy import sparse
+
+from .models import IngredientRecipe, Recipe, SimilarRecipe
+
+CHUNK_SIZE = 256
+
+
+def load_features():
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64,
+    )
+    ingredients = np.array(
+        IngredientRecipe.objects.values_list('recipe_id', 'ingredient_id'),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    tags = np.array(
+        Recipe.tags.through.objects.values_list('recipe_id', 'tag_id'),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    ingredient_ids, ingredient_columns = np.unique(
+        ingredients[:, 1], return_inverse=True
+    )
+    tag_ids, tag_columns = np.unique(tags[:, 1], return_inverse=True)
+    rows = np.searchsorted(
+        recipe_ids, np.concatenate((ingredients[:, 0], tags[:, 0]))
+    )
+    columns = np.concatenate((
+        ingredient_columns.ravel(),
+        tag_columns.ravel() + len(ingredient_ids),
+    ))
+    features = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)),
+        shape=(len(recipe_ids), len(ingredient_ids) + len(tag_ids)),
+    )
+    features.sum_duplicates()
+    features.data[:] = 1
+    frequency = np.bincount(features.indices, minlength=features.shape[1])
+    weights = np.log((1 + len(recipe_ids)) / (1 + frequency)) + 1
+    weights[len(ingredient_ids):] *= settings.SIMILAR_TAG_WEIGHT
+    features = features @ sparse.diags(weights)
+    norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)))
+    norms[norms == 0] = 1
+    return recipe_ids, sparse.csr_matrix(
+        sparse.diags(1 / norms.ravel()) @ features
+    )
+
+
+def top_neighbours(recipe_ids, features, rows, limit):
+    transposed = features.T.tocsc()
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        scores = (features[chunk] @ transposed).tocsr()
+        for position, row in enumerate(chunk):
+            begin, end = scores.indptr[position], scores.indptr[position + 1]
+            columns = scores.indices[begin:end]
+            values = scores.data[begin:end]
+            keep = columns != row
+            columns, values = columns[keep], values[keep]
+            if len(values) > limit:
+                top = np.argpartition(-values, limit)[:limit]
+                columns, values = columns[top], values[top]
+            order = np.argsort(-values, kind='stable')
+            yield int(recipe_ids[row]), [
+                (int(recipe_ids[column]), float(value))
+                for column, value in zip(columns[order], values[order])
+            ]
+
+
+def save_neighbours(neighbours, computed):
+    neighbours = dict(neighbours)
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=neighbours).delete()
+        SimilarRecipe.objects.bulk_create(
+            (
+                SimilarRecipe(recipe_id=pk, similar_id=similar, score=score)
+                for pk, similar_recipes in neighbours.items()
+                for similar, score in similar_recipes
+            ),
+            batch_size=settings.BULK_BATCH_SIZE,
+        )
+        Recipe.objects.filter(pk__in=neighbours).update(
+            similar_computed=computed
+        )
+
+
+def stale_recipes():
+    return Recipe.objects.filter(
+        Q(similar_computed__isnull=True)
+        | Q(modified__gt=F('similar_computed'))
+    ).values_list('id', flat=True)
+
+
+def refresh_similar_recipes(full=False, limit=None):
+    """Пересчитывает соседей изменённых рецептов или, при full, всех."""
+    limit = limit or settings.SIMILAR_RECIPES_LIMIT
+    computed = timezone.now()
+    stale = set(Recipe.objects.values_list('id', flat=True) if full
+                else stale_recipes())
+    if not stale:
+        return 0
+    recipe_ids, features = load_features()
+
+    def rows_for(pks):
+        return np.flatnonzero(np.isin(recipe_ids, list(pks)))
+
+    neighbours = dict(
+        top_neighbours(recipe_ids, features, rows_for(stale), limit)
+    )
+    if not full:
+        affected = set(SimilarRecipe.objects.filter(
+            similar_id__in=stale
+        ).values_list('recipe_id', flat=True))
+        for similar_recipes in neighbours.values():
+            affected.update(similar for similar, _ in similar_recipes)
+        affected -= stale
+        if affected:
+            neighbours.update(
+                top_neighbours(
+                    recipe_ids, features, rows_for(affected), limit
+                )
+            )
+    items = list(neighbours.items())
+    for start in range(0, len(items), settings.BULK_BATCH_SIZE):
+        save_neighbours(
+            items[start:start + settings.BULK_BATCH_SIZE], computed
+        )
+    return len(neighbours)
@@ -0,0 +1,19 @@
+from .models import Tag
+from .versions import VersionedSnapshot
+
+
+class TagIndex(VersionedSnapshot):
+    version_name = 'tag'
+
+    def build(self):
+        return dict(Tag.objects.values_list('slug', 'id'))
+
+    def get_slugs(self):
+        return [(slug, slug) for slug in self.get_snapshot()]
+
+    def get_ids(self, slugs):
+        tags = self.get_snapshot()
+        return [tags[slug] for slug in slugs if slug in tags]
+
+
+tag_index = TagIndex()
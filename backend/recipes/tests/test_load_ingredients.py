@@ -0,0 +1,25 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+DATA_DIR = settings.BASE_DIR.parent / 'data'
+
+
+class LoadIngredientsTest(TestCase):
+
+    def load(self, filename):
+        call_command(
+            'load_ingredients', DATA_DIR / filename, stdout=StringIO()
+        )
+        return set(Ingredient.objects.values_list('name', 'measurement_unit'))
+
+    def test_csv_and_json_load_the_same_ingredients(self):
+        from_csv = self.load('ingredients.csv')
+        self.assertIn(('ароматизатор "ананас"', 'по вкусу'), from_csv)
+        self.assertEqual(self.load('ingredients.json'), from_csv)
+        Ingredient.objects.all().delete()
+        self.assertEqual(self.load('ingredients.json'), from_csv)
@@ -0,0 +1,67 @@
+from threading import Lock, Thread
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+VERSION_KEY = 'foodgram:version:{}'
+
+
+def get_versions(*names):
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid4().hex, timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions[key] for key in keys]
+
+
+def get_version(name):
+    return get_versions(name)[0]
+
+
+def bump_version(*names):
+    transaction.on_commit(lambda: cache.set_many(
+        {VERSION_KEY.format(name): uuid4().hex for name in names},
+        timeout=None,
+    ))
+
+
+class VersionedSnapshot:
+    version_name = None
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.snapshot = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def get_snapshot(self):
+        version = get_version(self.version_name)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.snapshot = self.build()
+                    self.version = version
+        return self.snapshot
+
+    def get_ready_snapshot(self):
+        """Снимок без ожидания: пока идёт пересборка в фоне, отдаёт прежний."""
+        version = get_version(self.version_name)
+        if self.version == version:
+            return self.snapshot
+        if self.lock.acquire(blocking=False):
+            Thread(target=self.rebuild, args=(version,), daemon=True).start()
+        return self.snapshot
+
+    def rebuild(self, version):
+        try:
+            self.snapshot = self.build()
+            self.version = version
+        finally:
+            self.lock.release()
+            connection.close()
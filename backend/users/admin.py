@@ -1,17 +1,26 @@
 from django.contrib import admin
 
+from foodgram.query_budget import QueryBudgetAdminMixin
 from .models import Subscribe, User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email', 'id', 'first_name', 'last_name', )
-    search_fields = ('username', 'id', )
-    list_filter = ('username', 'id', )
+class UserAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'username', 'email', 'id', 'first_name', 'last_name',
+        'recipes_count', 'followers_count',
+    )
+    search_fields = ('username', 'email', )
+    list_filter = ('is_staff', 'is_active', )
+    show_full_result_count = False
+    changelist_query_budget = 3
 
 
 @admin.register(Subscribe)
-class SubscribeAdmin(admin.ModelAdmin):
+class SubscribeAdmin(QueryBudgetAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'author', )
-    search_fields = ('id', )
-    list_filter = ('id', )
+    list_select_related = ('user', 'author', )
+    search_fields = ('user__email', 'author__email', )
+    autocomplete_fields = ('user', 'author', )
+    show_full_result_count = False
+    changelist_query_budget = 3
@@ -36,6 +36,16 @@ class User(AbstractUser):
         'Фамилия',
         max_length=settings.MAX_VAL150,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('id',)